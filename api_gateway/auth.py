@@ -1,4 +1,9 @@
-from jose import JWTError, jwt
+import hashlib
+import time
+
+from cachetools import TTLCache
+import jwt
+from jwt import PyJWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
@@ -7,12 +12,26 @@ from config import settings
 
 # Bearer токен
 security = HTTPBearer()
+security_optional = HTTPBearer(auto_error=False)
+
+# Параметры проверки JWT, читаются из настроек один раз
+_JWT_SECRET_KEY = settings.JWT_SECRET_KEY
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+
+# Кэш успешно проверенных токенов: sha256(токен) -> payload
+_token_cache = TTLCache(maxsize=10_000, ttl=30)
 
 
 def decode_access_token(token: str) -> dict:
     """Декодируем и проверяем JWT токен"""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    payload = _token_cache.get(cache_key)
+    # Не отдаем из кэша токен, срок действия которого уже истек
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = jwt.decode(token, _JWT_SECRET_KEY, algorithms=_JWT_ALGORITHMS)
         user_id: str = payload.get("sub")
         
         if user_id is None:
@@ -21,8 +40,9 @@ def decode_access_token(token: str) -> dict:
                 detail="Could not validate credentials"
             )
         
+        _token_cache[cache_key] = payload
         return payload
-    except JWTError:
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
@@ -31,15 +51,19 @@ def decode_access_token(token: str) -> dict:
 
 async def verify_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> str:
-    """Проверяем JWT токен и возвращаем его для дальнейшей передачи"""
+) -> dict:
+    """Проверяем JWT токен и возвращаем заголовки для передачи во внутренние сервисы.
+    Сервисы могут доверять X-User-Id и не проверять токен повторно."""
     token = credentials.credentials
-    decode_access_token(token)
-    return token
+    payload = decode_access_token(token)
+    return {
+        "Authorization": f"Bearer {token}",
+        "X-User-Id": payload["sub"],
+    }
 
 
 async def get_token_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
 ) -> Optional[str]:
     """Получаем токен, если он есть """
     if credentials:
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,6 +9,7 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file="../.env",
         extra="ignore",
+        frozen=True,
     )
     
     # JWT
@@ -14,6 +17,10 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Разрешенные источники CORS, в .env задаются JSON-списком: ["https://example.com"].
+    # По умолчанию кросс-доменные запросы из браузера запрещены
+    ALLOWED_ORIGINS: List[str] = []
+    
     # Настройки текущего сервиса
     APP_HOST: str = Field(validation_alias="API_GATEWAY_HOST", default="0.0.0.0")
     APP_PORT: int = Field(validation_alias="API_GATEWAY_PORT", default=8000)
@@ -21,6 +28,11 @@ class Settings(BaseSettings):
     # URLs внутренних сервисов
     SERVICE_USERS_URL: str = "http://localhost:8001"
     SERVICE_ORDERS_URL: str = "http://localhost:8002"
+    
+    # Unix-сокеты внутренних сервисов, если они запущены на том же хосте.
+    # Если заданы, запросы идут через сокет, а URL используется только для заголовка Host
+    SERVICE_USERS_UDS: Optional[str] = None
+    SERVICE_ORDERS_UDS: Optional[str] = None
 
 
 settings = Settings()  # type: ignore
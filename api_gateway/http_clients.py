@@ -0,0 +1,43 @@
+from typing import Optional
+
+import httpx
+from starlette.responses import Response
+
+from config import settings
+
+# Общие лимиты пула соединений для клиентов внутренних сервисов
+limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+
+def _transport(uds: Optional[str]) -> httpx.AsyncHTTPTransport:
+    """Транспорт к сервису: через Unix-сокет, если он задан, иначе по TCP.
+    HTTP/2 согласуется через TLS (ALPN), для http:// остается HTTP/1.1 с keep-alive"""
+    return httpx.AsyncHTTPTransport(uds=uds, limits=limits, http2=True)
+
+
+# Постоянные клиенты, соединения переиспользуются между запросами
+users_client = httpx.AsyncClient(
+    base_url=settings.SERVICE_USERS_URL,
+    transport=_transport(settings.SERVICE_USERS_UDS),
+    timeout=30.0,
+)
+orders_client = httpx.AsyncClient(
+    base_url=settings.SERVICE_ORDERS_URL,
+    transport=_transport(settings.SERVICE_ORDERS_UDS),
+    timeout=30.0,
+)
+
+
+async def close_clients() -> None:
+    """Закрываем соединения клиентов при остановке приложения"""
+    await users_client.aclose()
+    await orders_client.aclose()
+
+
+def proxy_response(response: httpx.Response) -> Response:
+    """Отдаем клиенту ответ сервиса как есть, без повторного разбора и сериализации JSON"""
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type", "application/json"),
+    )
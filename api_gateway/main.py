@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,13 +7,22 @@ from starlette.responses import JSONResponse
 
 from config import settings
 from errors import ApiException
+from http_clients import close_clients
 from routers import users, orders
 from schemas import ApiResponse, ErrorDetail
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await close_clients()
+
+
 app = FastAPI(
     title="API Gateway",
     description="API Gateway для микросервисной архитектуры. Проксирует запросы к сервисам Users и Orders.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Обработчик ошибки валидации с Pydantic
@@ -48,10 +59,13 @@ async def api_exception_handler(_, exc: ApiException):
 # Настраиваем CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=settings.ALLOWED_ORIGINS,
+    # С "*" Starlette отражает любой Origin, поэтому куки и авторизацию разрешаем только для явного списка
+    allow_credentials="*" not in settings.ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Браузер кэширует ответ на preflight-запрос сутки
+    max_age=86400,
 )
 
 v1_prefix = "/v1"
@@ -59,6 +73,19 @@ app.include_router(users.router, prefix=v1_prefix)
 app.include_router(orders.router, prefix=v1_prefix)
 
 
+def custom_openapi() -> dict:
+    """OpenAPI схема с моделями, которые описаны в роутерах вручную"""
+    if app.openapi_schema:
+        return app.openapi_schema
+    schema = _default_openapi()
+    schema.setdefault("components", {}).setdefault("schemas", {}).update(orders.OPENAPI_COMPONENTS)
+    return schema
+
+
+_default_openapi = app.openapi
+app.openapi = custom_openapi
+
+
 @app.get("/", tags=["Health"])
 async def root():
     """Проверка работоспособности API Gateway"""
@@ -81,5 +108,7 @@ if __name__ == "__main__":
         "main:app",
         host=settings.APP_HOST,
         port=settings.APP_PORT,
+        loop="uvloop",
+        http="httptools",
         reload=True
     )
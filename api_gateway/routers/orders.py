@@ -1,14 +1,14 @@
 import httpx
 import logging
-from fastapi import APIRouter, Depends, Query, Path, status
+from fastapi import APIRouter, Depends, Query, Path, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
 from typing import Optional
 from uuid import UUID
 
-from starlette.responses import JSONResponse
-
 from auth import verify_token
-from config import settings
 from errors import ApiException
+from http_clients import orders_client, proxy_response
 from schemas import (
     OrderCreate, OrderUpdate, OrderStatus,
     OrderResponseSuccess, PaginatedOrdersResponseSuccess
@@ -17,28 +17,57 @@ from schemas import (
 router = APIRouter(prefix="/orders", tags=["Orders"])
 logger = logging.getLogger(__name__)
 
+# Валидатор тела запроса на создание заказа. Разбирает JSON сразу в pydantic-core,
+# без промежуточного словаря из request.json()
+_ORDER_CREATE_ADAPTER = TypeAdapter(OrderCreate)
+
+# Схема тела запроса для документации, т.к. FastAPI не видит модель в параметрах эндпоинта.
+# OrderCreate и вложенные в нее модели добавляются в components.schemas в main.py
+_ORDER_CREATE_SCHEMA = _ORDER_CREATE_ADAPTER.json_schema(ref_template="#/components/schemas/{model}")
+OPENAPI_COMPONENTS = {
+    **_ORDER_CREATE_SCHEMA.pop("$defs", {}),
+    OrderCreate.__name__: _ORDER_CREATE_SCHEMA,
+}
+
+
+def _body_error(error: dict) -> dict:
+    """Приводим ошибку pydantic к виду FastAPI, чтобы ее обработал общий обработчик валидации.
+    У ошибки разбора JSON нет поля, поэтому указываем его явно"""
+    if error["type"] == "json_invalid":
+        return {**error, "loc": ("body", "json")}
+    return {**error, "loc": ("body", *error["loc"])}
+
 
 @router.post(
     "/create",
     response_model=OrderResponseSuccess,
     status_code=status.HTTP_201_CREATED,
     summary="Создать новый заказ",
-    description="Создает новый заказ для текущего пользователя. Автоматически вычисляет итоговую сумму. Требует авторизации."
+    description="Создает новый заказ для текущего пользователя. Автоматически вычисляет итоговую сумму. Требует авторизации.",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{OrderCreate.__name__}"}}},
+        }
+    }
 )
 async def create_order(
-    order_data: OrderCreate,
-    token: str = Depends(verify_token)
+    request: Request,
+    auth_headers: dict = Depends(verify_token)
 ):
     """Создание нового заказа"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.SERVICE_ORDERS_URL}/v1/orders/",
-                json=order_data.model_dump(mode='json'),
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        order_data = _ORDER_CREATE_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([_body_error(error) for error in e.errors()])
+    
+    try:
+        response = await orders_client.post(
+            "/v1/orders/",
+            content=_ORDER_CREATE_ADAPTER.dump_json(order_data),
+            headers={**auth_headers, "Content-Type": "application/json"}
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Orders service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Orders service is unavailable")
@@ -53,10 +82,12 @@ async def create_order(
 async def get_user_orders(
     page: int = Query(1, ge=1, description="Номер страницы"),
     page_size: int = Query(10, ge=1, le=100, description="Количество элементов на странице"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
     status_filter: Optional[OrderStatus] = Query(None, description="Фильтр по статусу заказа"),
     sort_by: str = Query("created_at", description="Поле для сортировки (created_at, updated_at, total_amount)"),
     sort_order: str = Query("desc", description="Направление сортировки (asc, desc)"),
-    token: str = Depends(verify_token)
+    include_items: bool = Query(True, description="Включать товары заказов в список"),
+    auth_headers: dict = Depends(verify_token)
 ):
     """Получение списка заказов текущего пользователя"""
     try:
@@ -64,19 +95,20 @@ async def get_user_orders(
             "page": page,
             "page_size": page_size,
             "sort_by": sort_by,
-            "sort_order": sort_order
+            "sort_order": sort_order,
+            "include_items": include_items
         }
+        if cursor:
+            params["cursor"] = cursor
         if status_filter:
             params["status_filter"] = status_filter.value
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SERVICE_ORDERS_URL}/v1/orders/",
-                params=params,
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await orders_client.get(
+            "/v1/orders/",
+            params=params,
+            headers=auth_headers
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Orders service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Orders service is unavailable")
@@ -90,17 +122,15 @@ async def get_user_orders(
 )
 async def get_order(
     order_id: UUID = Path(..., description="Идентификатор заказа"),
-    token: str = Depends(verify_token)
+    auth_headers: dict = Depends(verify_token)
 ):
     """Получение заказа по идентификатору"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SERVICE_ORDERS_URL}/v1/orders/{order_id}",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await orders_client.get(
+            f"/v1/orders/{order_id}",
+            headers=auth_headers
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Orders service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Orders service is unavailable")
@@ -115,18 +145,16 @@ async def get_order(
 async def update_order_status(
     order_id: UUID = Path(..., description="Идентификатор заказа"),
     update_data: OrderUpdate = ...,
-    token: str = Depends(verify_token)
+    auth_headers: dict = Depends(verify_token)
 ):
     """Обновление статуса заказа"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{settings.SERVICE_ORDERS_URL}/v1/orders/{order_id}/status",
-                json=update_data.model_dump(mode='json'),
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await orders_client.put(
+            f"/v1/orders/{order_id}/status",
+            content=update_data.model_dump_json(),
+            headers={**auth_headers, "Content-Type": "application/json"}
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Orders service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Orders service is unavailable")
@@ -140,17 +168,15 @@ async def update_order_status(
 )
 async def cancel_order(
     order_id: UUID = Path(..., description="Идентификатор заказа"),
-    token: str = Depends(verify_token)
+    auth_headers: dict = Depends(verify_token)
 ):
     """Отмена заказа"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{settings.SERVICE_ORDERS_URL}/v1/orders/{order_id}",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await orders_client.delete(
+            f"/v1/orders/{order_id}",
+            headers=auth_headers
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Orders service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Orders service is unavailable")
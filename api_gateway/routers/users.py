@@ -1,3 +1,4 @@
+import asyncio
 import httpx
 import logging
 from fastapi import APIRouter, Depends, Query, status
@@ -6,11 +7,12 @@ from typing import Optional
 from starlette.responses import JSONResponse
 
 from auth import verify_token, get_token_optional
-from config import settings
 from errors import ApiException
+from http_clients import users_client, orders_client, proxy_response
 from schemas import (
     UserRegister, UserLogin, UserUpdate,
-    UserResponseSuccess, TokenResponseSuccess, PaginatedUsersResponseSuccess
+    UserResponseSuccess, TokenResponseSuccess, PaginatedUsersResponseSuccess,
+    DashboardResponseSuccess
 )
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -27,13 +29,12 @@ logger = logging.getLogger(__name__)
 async def register(user_data: UserRegister):
     """Регистрация нового пользователя"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.SERVICE_USERS_URL}/v1/auth/register",
-                json=user_data.model_dump(mode='json'),
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await users_client.post(
+            "/v1/auth/register",
+            content=user_data.model_dump_json(),
+            headers={"Content-Type": "application/json"}
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Users service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Users service is unavailable")
@@ -48,13 +49,12 @@ async def register(user_data: UserRegister):
 async def login(credentials: UserLogin):
     """Авторизация пользователя"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.SERVICE_USERS_URL}/v1/auth/login",
-                json=credentials.model_dump(mode='json'),
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await users_client.post(
+            "/v1/auth/login",
+            content=credentials.model_dump_json(),
+            headers={"Content-Type": "application/json"}
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Users service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Users service is unavailable")
@@ -66,21 +66,62 @@ async def login(credentials: UserLogin):
     summary="Получить профиль текущего пользователя",
     description="Возвращает информацию о текущем авторизованном пользователе. Требует авторизации."
 )
-async def get_current_user_profile(token: str = Depends(verify_token)):
+async def get_current_user_profile(auth_headers: dict = Depends(verify_token)):
     """Получение профиля текущего пользователя"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SERVICE_USERS_URL}/v1/users/me",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await users_client.get(
+            "/v1/users/me",
+            headers=auth_headers
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Users service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Users service is unavailable")
 
 
+@router.get(
+    "/me/dashboard",
+    response_model=DashboardResponseSuccess,
+    summary="Получить профиль и последние заказы текущего пользователя",
+    description="Возвращает профиль текущего пользователя и первую страницу его заказов одним запросом. Требует авторизации."
+)
+async def get_current_user_dashboard(auth_headers: dict = Depends(verify_token)):
+    """Получение профиля и последних заказов текущего пользователя.
+    Запросы к сервисам выполняются параллельно"""
+    try:
+        user_response, orders_response = await asyncio.gather(
+            users_client.get("/v1/users/me", headers=auth_headers),
+            orders_client.get(
+                "/v1/orders/",
+                params={"page": 1, "page_size": 10},
+                headers=auth_headers
+            ),
+        )
+    except httpx.RequestError as e:
+        logger.error(f"Dashboard services error: {str(e)}")
+        raise ApiException("SERVICE_UNAVAILABLE", "Users or orders service is unavailable")
+    
+    # Ошибку сервиса отдаем как есть, не разбирая тело: оно может быть не JSON
+    bodies = []
+    for response in (user_response, orders_response):
+        if response.is_error:
+            return proxy_response(response)
+        try:
+            body = response.json()
+        except ValueError:
+            return proxy_response(response)
+        if not body.get("success"):
+            return proxy_response(response)
+        bodies.append(body)
+    user_body, orders_body = bodies
+    
+    return JSONResponse({
+        "success": True,
+        "data": {"user": user_body["data"], "orders": orders_body["data"]},
+        "error": None
+    })
+
+
 @router.put(
     "/me",
     response_model=UserResponseSuccess,
@@ -89,18 +130,16 @@ async def get_current_user_profile(token: str = Depends(verify_token)):
 )
 async def update_current_user_profile(
     update_data: UserUpdate,
-    token: str = Depends(verify_token)
+    auth_headers: dict = Depends(verify_token)
 ):
     """Обновление профиля текущего пользователя"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{settings.SERVICE_USERS_URL}/v1/users/me",
-                json=update_data.model_dump(mode='json', exclude_none=True),
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await users_client.put(
+            "/v1/users/me",
+            content=update_data.model_dump_json(exclude_none=True),
+            headers={**auth_headers, "Content-Type": "application/json"}
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Users service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Users service is unavailable")
@@ -115,26 +154,27 @@ async def update_current_user_profile(
 async def get_all_users(
     page: int = Query(1, ge=1, description="Номер страницы"),
     page_size: int = Query(10, ge=1, le=100, description="Количество элементов на странице"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
     search: Optional[str] = Query(None, description="Поиск по имени или email"),
     role: Optional[str] = Query(None, description="Фильтр по роли"),
-    token: str = Depends(verify_token)
+    auth_headers: dict = Depends(verify_token)
 ):
     """Получение списка всех пользователей (только для администраторов)"""
     try:
         params = {"page": page, "page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
         if search:
             params["search"] = search
         if role:
             params["role"] = role
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SERVICE_USERS_URL}/v1/users/",
-                params=params,
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=30.0
-            )
-            return JSONResponse(response.json(), status_code=response.status_code)
+        response = await users_client.get(
+            "/v1/users/",
+            params=params,
+            headers=auth_headers
+        )
+        return proxy_response(response)
     except httpx.RequestError as e:
         logger.error(f"Users service error: {str(e)}")
         raise ApiException("SERVICE_UNAVAILABLE", "Users service is unavailable")
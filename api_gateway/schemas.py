@@ -19,12 +19,13 @@ class UserRegister(BaseModel):
     email: EmailStr = Field(..., description="Email пользователя")
     password: str = Field(..., min_length=8, description="Пароль (минимум 8 символов)")
     name: str = Field(..., min_length=1, max_length=100, description="Имя пользователя")
-    roles: List[UserRole] = Field(default=[UserRole.CLIENT], description="Роли пользователя")
+    roles: List[UserRole] = Field(default_factory=lambda: [UserRole.CLIENT], min_length=1, description="Роли пользователя")
 
 
 class UserLogin(BaseModel):
-    """Схема для авторизации пользователя"""
-    email: EmailStr = Field(..., description="Email пользователя")
+    """Схема для авторизации пользователя.
+    Email передается как есть: проверяет и нормализует его сервис пользователей, как при регистрации"""
+    email: str = Field(..., description="Email пользователя")
     password: str = Field(..., description="Пароль")
 
 
@@ -53,10 +54,12 @@ class Token(BaseModel):
 class PaginatedUsers(BaseModel):
     """Схема ответа списка пользователей с пагинацией"""
     items: List[UserResponse] = Field(..., description="Список пользователей")
-    total: int = Field(..., description="Общее количество пользователей")
-    page: int = Field(..., description="Текущая страница")
+    total: Optional[int] = Field(None, description="Общее количество пользователей (не считается при запросе по курсору)")
+    page: Optional[int] = Field(None, description="Текущая страница (не задается при запросе по курсору)")
     page_size: int = Field(..., description="Количество элементов на странице")
-    pages: int = Field(..., description="Общее количество страниц")
+    pages: Optional[int] = Field(None, description="Общее количество страниц (не считается при запросе по курсору)")
+    has_next: bool = Field(False, description="Есть ли следующая страница")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы, если она есть")
 
 
 # ============== Order Schemas ==============
@@ -91,7 +94,7 @@ class OrderResponse(BaseModel):
     """Схема заказа в ответах"""
     id: UUID = Field(..., description="Уникальный идентификатор заказа")
     user_id: UUID = Field(..., description="Идентификатор пользователя")
-    items: List[dict] = Field(..., description="Список товаров в заказе")
+    items: Optional[List[dict]] = Field(None, description="Список товаров в заказе (в списке заказов - если include_items)")
     status: OrderStatus = Field(..., description="Статус заказа")
     total_amount: Decimal = Field(..., description="Итоговая сумма заказа")
     created_at: datetime = Field(..., description="Дата создания заказа")
@@ -101,10 +104,20 @@ class OrderResponse(BaseModel):
 class PaginatedOrders(BaseModel):
     """Схема ответа списка заказов с пагинацией"""
     items: List[OrderResponse] = Field(..., description="Список заказов")
-    total: int = Field(..., description="Общее количество заказов")
-    page: int = Field(..., description="Текущая страница")
+    total: Optional[int] = Field(None, description="Общее количество заказов (не считается при запросе по курсору)")
+    page: Optional[int] = Field(None, description="Текущая страница (не задается при запросе по курсору)")
     page_size: int = Field(..., description="Количество элементов на странице")
-    pages: int = Field(..., description="Общее количество страниц")
+    pages: Optional[int] = Field(None, description="Общее количество страниц (не считается при запросе по курсору)")
+    has_next: bool = Field(False, description="Есть ли следующая страница")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы, если она есть")
+
+
+# ============== Dashboard Schemas ==============
+
+class Dashboard(BaseModel):
+    """Схема сводки по текущему пользователю"""
+    user: UserResponse = Field(..., description="Профиль пользователя")
+    orders: PaginatedOrders = Field(..., description="Последние заказы пользователя")
 
 
 # ============== Common Schemas ==============
@@ -157,3 +170,10 @@ class PaginatedOrdersResponseSuccess(BaseModel):
     success: bool = Field(True, description="Статус выполнения запроса")
     data: PaginatedOrders = Field(..., description="Список заказов с пагинацией")
     error: Optional[ErrorDetail] = Field(None, description="Информация об ошибке")
+
+
+class DashboardResponseSuccess(BaseModel):
+    """Успешный ответ со сводкой по пользователю"""
+    success: bool = Field(True, description="Статус выполнения запроса")
+    data: Dashboard = Field(..., description="Профиль и последние заказы пользователя")
+    error: Optional[ErrorDetail] = Field(None, description="Информация об ошибке")
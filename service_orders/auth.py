@@ -1,19 +1,39 @@
-from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+import hashlib
+import time
+from functools import lru_cache
+
+from cachetools import TTLCache
+import jwt
+from jwt import PyJWTError
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import Optional
 from uuid import UUID
 
 from config import settings
 from schemas import TokenData
 
-# Bearer токен
-security = HTTPBearer()
+# Bearer токен. Не обязателен, если пользователь передан API Gateway в X-User-Id
+security = HTTPBearer(auto_error=False)
+
+# Параметры проверки JWT, читаются из настроек один раз
+_JWT_SECRET_KEY = settings.JWT_SECRET_KEY
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+
+# Кэш успешно проверенных токенов: sha256(токен) -> (данные токена, время истечения)
+_token_cache = TTLCache(maxsize=10_000, ttl=30)
 
 
 def decode_access_token(token: str) -> TokenData:
     """Декодируем и проверяем JWT токен"""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(cache_key)
+    # Не отдаем из кэша токен, срок действия которого уже истек
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = jwt.decode(token, _JWT_SECRET_KEY, algorithms=_JWT_ALGORITHMS)
         user_id: str = payload.get("sub")
         email: str = payload.get("email")
         
@@ -23,23 +43,40 @@ def decode_access_token(token: str) -> TokenData:
                 detail="Could not validate credentials"
             )
         
-        return TokenData(user_id=user_id, email=email)
-    except JWTError:
+        token_data = TokenData(user_id=user_id, email=email)
+        _token_cache[cache_key] = (token_data, payload.get("exp", 0))
+        return token_data
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
 
+@lru_cache(maxsize=10_000)
+def _parse_user_id(raw_user_id: str) -> UUID:
+    """Разбираем ID пользователя. Результат кэшируется, т.к. одни и те же ID приходят постоянно"""
+    return UUID(raw_user_id)
+
+
 async def get_current_user_id(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
 ) -> UUID:
-    """Получаем ID текущего авторизованного пользователя из JWT токена"""
-    token = credentials.credentials
-    token_data = decode_access_token(token)
+    """Получаем ID текущего авторизованного пользователя.
+    Если включено доверие к API Gateway, берем его из X-User-Id, иначе из JWT токена"""
+    raw_user_id = request.headers.get("X-User-Id") if settings.TRUST_GATEWAY_HEADERS else None
+    
+    if raw_user_id is None:
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authenticated"
+            )
+        raw_user_id = decode_access_token(credentials.credentials).user_id
     
     try:
-        user_id = UUID(token_data.user_id)
+        user_id = _parse_user_id(raw_user_id)
     except (ValueError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,53 +1,69 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from config import settings
 from database import engine, Base
 from errors import ApiException
 from routers import orders
-from schemas import ApiResponse, ErrorDetail
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Orders Service")
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Создаем таблицы при запуске приложения, а не при импорте модуля
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    # Закрываем соединения пула при остановке приложения
+    await engine.dispose()
+
+
+app = FastAPI(title="Orders Service", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Обработчик ошибки валидации с Pydantic
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(_, exc: RequestValidationError):
     first_error = exc.errors()[0]
-    return JSONResponse(status_code=400, content=ApiResponse(
-                success=False,
-                data=None,
-                error=ErrorDetail(
-                    code="VALIDATION_ERROR",
-                    message='.'.join(map(str, first_error['loc'][1:])) + ": " + first_error['msg'],
-                )
-            ).model_dump(mode='json'))
+    return ORJSONResponse(
+        status_code=400,
+        content={
+            "success": False,
+            "data": None,
+            "error": {
+                "code": "VALIDATION_ERROR",
+                "message": '.'.join(map(str, first_error['loc'][1:])) + ": " + first_error['msg'],
+            },
+        },
+    )
 
 # Обработчик кастомный ошибки
 @app.exception_handler(ApiException)
 async def unicorn_exception_handler(_, exc: ApiException):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=400,
-        content=ApiResponse(
-            success=False,
-            data=None,
-            error=ErrorDetail(
-                code=exc.code,
-                message=exc.message,
-            )
-        ).model_dump(mode='json'),
+        content={
+            "success": False,
+            "data": None,
+            "error": {
+                "code": exc.code,
+                "message": exc.message,
+            },
+        },
     )
 
 # Настраиваем CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=settings.ALLOWED_ORIGINS,
+    # С "*" Starlette отражает любой Origin, поэтому куки и авторизацию разрешаем только для явного списка
+    allow_credentials="*" not in settings.ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Браузер кэширует ответ на preflight-запрос сутки
+    max_age=86400,
 )
 
 v1_prefix = "/v1"
@@ -60,5 +76,8 @@ if __name__ == "__main__":
         "main:app",
         host=settings.APP_HOST,
         port=settings.APP_PORT,
+        uds=settings.APP_UDS,
+        loop="uvloop",
+        http="httptools",
         reload=True
     )
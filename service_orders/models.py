@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Numeric, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Numeric, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 import uuid
@@ -20,9 +20,21 @@ class Order(Base):
     __tablename__ = "orders"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)  # Индексируется составными индексами ниже
     items = Column(JSONB, nullable=False)  # Массив JSON объектов с товарами
     status = Column(SQLEnum(OrderStatus), nullable=False, default=OrderStatus.CREATED)
     total_amount = Column(Numeric(10, 2), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # Индексы под пагинацию по ключу (sort_column, id) в списке заказов пользователя
+        Index("ix_orders_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        Index("ix_orders_user_id_updated_at_id", user_id, updated_at.desc(), id.desc()),
+        Index("ix_orders_user_id_total_amount_id", user_id, total_amount.desc(), id.desc()),
+        # Список заказов с фильтром по статусу (сортировка по умолчанию)
+        Index("ix_orders_user_id_status_created_at_id", user_id, status, created_at.desc(), id.desc()),
+        # Задел под будущий фильтр заказов по содержимому товаров (items @> '[{"name": ...}]').
+        # Сейчас ни один запрос не фильтрует по items, индекс только обновляется при вставке
+        Index("ix_orders_items_gin", items, postgresql_using="gin", postgresql_ops={"items": "jsonb_path_ops"}),
+    )
@@ -1,275 +1,395 @@
 import logging
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy import select, insert, update, func, desc, asc, tuple_, text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
+from datetime import datetime
 from decimal import Decimal
 import math
 
-from starlette.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from database import get_db
 from errors import ApiException
 from models import Order, OrderStatus
 from schemas import (
-    OrderCreate, OrderUpdate, OrderResponse, ApiResponse, 
-    ErrorDetail, PaginatedOrders
+    OrderCreate, OrderUpdate, OrderResponse, ORDER_LIST_ADAPTER
 )
 from auth import get_current_user_id
+from pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 logger = logging.getLogger(__name__)
 
-@router.post("/", response_model=ApiResponse, status_code=status.HTTP_201_CREATED)
+# Допустимые поля сортировки и разбор их значений из курсора
+_SORT_COLUMNS = {
+    "created_at": (Order.created_at, datetime.fromisoformat),
+    "updated_at": (Order.updated_at, datetime.fromisoformat),
+    "total_amount": (Order.total_amount, Decimal),
+}
+
+# Колонки для списка заказов: без items, если товары не запрошены
+_ORDER_SUMMARY_COLUMNS = (
+    Order.id, Order.user_id, Order.status, Order.total_amount, Order.created_at, Order.updated_at,
+)
+_ORDER_LIST_COLUMNS = _ORDER_SUMMARY_COLUMNS + (Order.items,)
+
+# Заказ по id без ORM: запрос собирается один раз, колонки типизированы моделью
+_GET_ORDER_SQL = text(
+    "SELECT id, user_id, items, status, total_amount, created_at, updated_at "
+    "FROM orders WHERE id = :id"
+).bindparams(
+    bindparam("id", type_=Order.id.type)
+).columns(
+    Order.id, Order.user_id, Order.items, Order.status, Order.total_amount, Order.created_at, Order.updated_at,
+)
+
+
+@router.post("/", response_model=None, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
     current_user_id: UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Создание нового заказа"""
     try:
-        # Вычисляем общую сумму заказа
-        total_amount = Decimal(0)
-        items_list = []
-        
-        for item in order_data.items:
-            item_dict = item.model_dump(mode='json')
-            items_list.append(item_dict)
-            total_amount += item.price * item.amount
+        # Товары сериализуем одним вызовом, общую сумму заказа считаем одним проходом
+        items_list = order_data.model_dump(mode='json')["items"]
+        total_amount = sum((item.price * item.amount for item in order_data.items), Decimal(0))
         
-        # Создаем новый заказ
-        new_order = Order(
-            user_id=current_user_id,
-            items=items_list,
-            status=OrderStatus.CREATED,
-            total_amount=total_amount
+        # Создаем новый заказ, сгенерированные поля возвращаются тем же INSERT
+        new_order = await db.scalar(
+            insert(Order)
+            .values(
+                user_id=current_user_id,
+                items=items_list,
+                status=OrderStatus.CREATED,
+                total_amount=total_amount
+            )
+            .returning(Order)
         )
+        await db.commit()
         
-        db.add(new_order)
-        db.commit()
-        db.refresh(new_order)
-        
-        return ApiResponse(
-            success=True,
-            data=OrderResponse.model_validate(new_order).model_dump(mode='json'),
-            error=None
-        )
+        return ORJSONResponse(status_code=status.HTTP_201_CREATED, content={
+            "success": True,
+            "data": OrderResponse.model_validate(new_order).model_dump(mode='json'),
+            "error": None,
+        })
     
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Order creation failed: {str(e)}")
+    except ApiException:
+        raise
+    except Exception:
+        await db.rollback()
+        logger.exception("Order creation failed")
         raise ApiException("ORDER_CREATION_FAILED", "Order creation failed")
 
 
-@router.get("/{order_id}", response_model=ApiResponse)
+@router.get("/{order_id}", response_model=None)
 async def get_order(
     order_id: UUID,
     current_user_id: UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение заказа по идентификатору"""
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = (await db.execute(_GET_ORDER_SQL, {"id": order_id})).mappings().first()
         
         if not order:
-            return ApiResponse(
-                success=False,
-                data=None,
-                error=ErrorDetail(
-                    code="ORDER_NOT_FOUND",
-                    message="Order not found"
-                )
-            )
+            return ORJSONResponse({
+                "success": False,
+                "data": None,
+                "error": {
+                    "code": "ORDER_NOT_FOUND",
+                    "message": "Order not found"
+                },
+            })
         
         # Проверяем права доступа - пользователь может видеть только свои заказы
-        if order.user_id != current_user_id:
+        if order["user_id"] != current_user_id:
             raise ApiException(
                 code="ACCESS_DENIED",
                 message="You don't have permission to view this order"
             )
         
-        return ApiResponse(
-            success=True,
-            data=OrderResponse.model_validate(order).model_dump(mode='json'),
-            error=None
-        )
+        # Данные из БД уже нужных типов, повторная валидация не нужна
+        return ORJSONResponse({
+            "success": True,
+            "data": OrderResponse.model_construct(**order).model_dump(mode='json'),
+            "error": None,
+        })
     
-    except Exception as e:
-        logger.error(f"Order retrieval failed: {str(e)}")
-        if isinstance(e, ApiException): raise e
+    except ApiException:
+        raise
+    except Exception:
+        logger.exception("Order retrieval failed")
         raise ApiException(
             code="FETCH_ORDER_FAILED",
             message="Order retrieval failed"
         )
 
 
-@router.get("/", response_model=ApiResponse)
+@router.get("/", response_model=None)
 async def get_user_orders(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page (next_cursor from the previous response)"),
     status_filter: Optional[OrderStatus] = Query(None, description="Filter by status"),
     sort_by: str = Query("created_at", description="Sort field (created_at, updated_at, total_amount)"),
     sort_order: str = Query("desc", description="Sort order (asc, desc)"),
+    include_items: bool = Query(True, description="Include order items in the list"),
     current_user_id: UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение списка заказов текущего пользователя с пагинацией и сортировкой"""
+    """Получение списка заказов текущего пользователя с пагинацией и сортировкой.
+    С курсором страница выбирается по ключу (sort_column, id) без OFFSET и подсчета total,
+    без курсора total считается оконной функцией в том же запросе"""
+    sort_column, parse_value = _SORT_COLUMNS.get(sort_by, _SORT_COLUMNS["created_at"])
+    last_key = decode_cursor(cursor, parse_value) if cursor else None
+
     try:
-        # Базовый запрос - только заказы текущего пользователя
-        query = db.query(Order).filter(Order.user_id == current_user_id)
+        # Базовый запрос - только заказы текущего пользователя и только нужные колонки
+        columns = _ORDER_LIST_COLUMNS if include_items else _ORDER_SUMMARY_COLUMNS
+        query = select(*columns).where(Order.user_id == current_user_id)
         
         # Применяем фильтр по статусу
         if status_filter:
-            query = query.filter(Order.status == status_filter)
+            query = query.where(Order.status == status_filter)
         
-        # Применяем сортировку
-        sort_column = getattr(Order, sort_by, Order.created_at)
+        # Применяем сортировку, id - для однозначного порядка при равных значениях
         if sort_order == "asc":
-            query = query.order_by(asc(sort_column))
+            ordering = (asc(sort_column), asc(Order.id))
         else:
-            query = query.order_by(desc(sort_column))
+            ordering = (desc(sort_column), desc(Order.id))
+        query = query.order_by(*ordering)
         
-        # Получаем общее количество заказов с текущими фильтрами
-        total = query.count()
-        
-        # Считаем данные для пагинации
-        pages = math.ceil(total / page_size) if total > 0 else 1
-        offset = (page - 1) * page_size
+        if last_key is not None:
+            # Продолжаем с места, где закончилась предыдущая страница
+            if sort_order == "asc":
+                query = query.where(tuple_(sort_column, Order.id) > last_key)
+            else:
+                query = query.where(tuple_(sort_column, Order.id) < last_key)
+            total = pages = page = None
+            # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+            orders = (await db.execute(query.limit(page_size + 1))).all()
+            has_next = len(orders) > page_size
+            orders = orders[:page_size]
+        else:
+            offset = (page - 1) * page_size
+            
+            # OFFSET проходим только по id в индексе, полные строки догружаем для одной страницы.
+            # Общее количество заказов с текущими фильтрами считаем тем же запросом
+            page_ids = (
+                query.with_only_columns(Order.id, func.count().over().label("total"))
+                .offset(offset)
+                .limit(page_size)
+                .subquery()
+            )
+            orders = (await db.execute(
+                select(*columns, page_ids.c.total)
+                .join(page_ids, Order.id == page_ids.c.id)
+                .order_by(*ordering)
+            )).all()
+            if orders:
+                total = orders[0].total
+            elif offset:
+                # Страница за пределами выборки - количество считаем отдельно
+                total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+            else:
+                total = 0
+            
+            # Считаем данные для пагинации
+            pages = math.ceil(total / page_size) if total > 0 else 1
+            has_next = offset + len(orders) < total
         
-        orders = query.offset(offset).limit(page_size).all()
+        next_cursor = None
+        if has_next and orders:
+            last_order = orders[-1]
+            next_cursor = encode_cursor(getattr(last_order, sort_column.key), last_order.id)
         
-        paginated_data = PaginatedOrders(
-            items=[OrderResponse.model_validate(order) for order in orders],
-            total=total,
-            page=page,
-            page_size=page_size,
-            pages=pages
-        )
+        # Страница заказов, сами заказы сериализуются одним проходом
+        paginated_data = {
+            "items": ORDER_LIST_ADAPTER.dump_python(
+                ORDER_LIST_ADAPTER.validate_python(orders, from_attributes=True), mode='json'
+            ),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": pages,
+            "has_next": has_next,
+            "next_cursor": next_cursor,
+        }
         
-        return ApiResponse(
-            success=True,
-            data=paginated_data.model_dump(mode='json'),
-            error=None
-        )
+        return ORJSONResponse({
+            "success": True,
+            "data": paginated_data,
+            "error": None,
+        })
     
-    except Exception as e:
+    except ApiException:
+        raise
+    except Exception:
+        logger.exception("Orders retrieval failed")
         raise ApiException(
             code="FETCH_ORDERS_FAILED",
             message="Orders retrieval failed"
         )
 
 
-@router.put("/{order_id}/status", response_model=ApiResponse)
+@router.put("/{order_id}/status", response_model=None)
 async def update_order_status(
     order_id: UUID,
     update_data: OrderUpdate,
     current_user_id: UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление статуса заказа"""
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
-        
-        if not order:
-            raise ApiException(
-                code="ORDER_NOT_FOUND",
-                message="Order not found"
-            )
-        
-        # Проверяем права доступа - пользователь может изменять только свои заказы
-        if order.user_id != current_user_id:
-            raise ApiException(
-                code="ACCESS_DENIED",
-                message="You don't have permission to update this order"
-            )
+        # Обновляем одним запросом: владелец и допустимость смены статуса проверяются в WHERE
+        blocked_statuses = [OrderStatus.CANCELLED]
+        if update_data.status != OrderStatus.COMPLETED:
+            blocked_statuses.append(OrderStatus.COMPLETED)
         
-        # Проверяем валидность изменения статуса
-        if order.status == OrderStatus.CANCELLED:
-            raise ApiException(
-                code="INVALID_STATUS_CHANGE",
-                message="Cannot change status of cancelled order"
+        order = await db.scalar(
+            update(Order)
+            .where(
+                Order.id == order_id,
+                Order.user_id == current_user_id,
+                Order.status.notin_(blocked_statuses),
             )
+            .values(status=update_data.status)
+            .returning(Order)
+            .execution_options(synchronize_session=False)
+        )
         
-        if order.status == OrderStatus.COMPLETED and update_data.status != OrderStatus.COMPLETED:
+        if order is None:
+            # Ничего не обновили - выясняем причину
+            order = (await db.execute(
+                select(Order.user_id, Order.status).where(Order.id == order_id)
+            )).one_or_none()
+            
+            if not order:
+                raise ApiException(
+                    code="ORDER_NOT_FOUND",
+                    message="Order not found"
+                )
+            
+            # Пользователь может изменять только свои заказы
+            if order.user_id != current_user_id:
+                raise ApiException(
+                    code="ACCESS_DENIED",
+                    message="You don't have permission to update this order"
+                )
+            
+            if order.status == OrderStatus.CANCELLED:
+                raise ApiException(
+                    code="INVALID_STATUS_CHANGE",
+                    message="Cannot change status of cancelled order"
+                )
+            
+            if order.status == OrderStatus.COMPLETED:
+                raise ApiException(
+                    code="INVALID_STATUS_CHANGE",
+                    message="Cannot change status of completed order"
+                )
+            
+            # Заказ изменили параллельно между двумя запросами
             raise ApiException(
-                code="INVALID_STATUS_CHANGE",
-                message="Cannot change status of completed order"
+                code="UPDATE_ORDER_FAILED",
+                message="Order update failed"
             )
         
-        # Обновляем статус
-        order.status = update_data.status
-        db.commit()
-        db.refresh(order)
+        await db.commit()
         
-        return ApiResponse(
-            success=True,
-            data=OrderResponse.model_validate(order).model_dump(mode='json'),
-            error=None
-        )
+        return ORJSONResponse({
+            "success": True,
+            "data": OrderResponse.model_validate(order).model_dump(mode='json'),
+            "error": None,
+        })
     
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Order update failed: {str(e)}")
-        if isinstance(e, ApiException): raise e
+    except ApiException:
+        raise
+    except Exception:
+        await db.rollback()
+        logger.exception("Order update failed")
         raise ApiException(
             code="UPDATE_ORDER_FAILED",
             message="Order update failed"
         )
 
 
-@router.delete("/{order_id}", response_model=ApiResponse)
+@router.delete("/{order_id}", response_model=None)
 async def cancel_order(
     order_id: UUID,
     current_user_id: UUID = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Отмена заказа (изменение статуса на 'отменён')"""
     try:
-        order = db.query(Order).filter(Order.id == order_id).first()
-        
-        if not order:
-            raise ApiException(
-                code="ORDER_NOT_FOUND",
-                message="Order not found"
-            )
-        
-        # Проверяем права доступа
-        if order.user_id != current_user_id:
-            raise ApiException(
-                code="ACCESS_DENIED",
-                message="You don't have permission to cancel this order"
-            )
-        
-        # Проверяем можно ли отменить заказ
-        if order.status == OrderStatus.CANCELLED:
-            raise ApiException(
-                code="ORDER_ALREADY_CANCELLED",
-                message="Order is already cancelled"
+        # Отменяем одним запросом: владелец и возможность отмены проверяются в WHERE
+        order = await db.scalar(
+            update(Order)
+            .where(
+                Order.id == order_id,
+                Order.user_id == current_user_id,
+                Order.status.notin_([OrderStatus.CANCELLED, OrderStatus.COMPLETED]),
             )
+            .values(status=OrderStatus.CANCELLED)
+            .returning(Order)
+            .execution_options(synchronize_session=False)
+        )
         
-        if order.status == OrderStatus.COMPLETED:
+        if order is None:
+            # Ничего не обновили - выясняем причину
+            order = (await db.execute(
+                select(Order.user_id, Order.status).where(Order.id == order_id)
+            )).one_or_none()
+            
+            if not order:
+                raise ApiException(
+                    code="ORDER_NOT_FOUND",
+                    message="Order not found"
+                )
+            
+            # Проверяем права доступа
+            if order.user_id != current_user_id:
+                raise ApiException(
+                    code="ACCESS_DENIED",
+                    message="You don't have permission to cancel this order"
+                )
+            
+            if order.status == OrderStatus.CANCELLED:
+                raise ApiException(
+                    code="ORDER_ALREADY_CANCELLED",
+                    message="Order is already cancelled"
+                )
+            
+            if order.status == OrderStatus.COMPLETED:
+                raise ApiException(
+                    code="CANNOT_CANCEL_COMPLETED",
+                    message="Cannot cancel completed order"
+                )
+            
+            # Заказ изменили параллельно между двумя запросами
             raise ApiException(
-                code="CANNOT_CANCEL_COMPLETED",
-                message="Cannot cancel completed order"
+                code="CANCEL_ORDER_FAILED",
+                message="Cancel order failed"
             )
         
-        # Отменяем заказ
-        order.status = OrderStatus.CANCELLED
-        db.commit()
-        db.refresh(order)
+        await db.commit()
         
-        return ApiResponse(
-            success=True,
-            data=OrderResponse.model_validate(order).model_dump(mode='json'),
-            error=None
-        )
+        return ORJSONResponse({
+            "success": True,
+            "data": OrderResponse.model_validate(order).model_dump(mode='json'),
+            "error": None,
+        })
     
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Order cancel failed: {str(e)}")
-        if isinstance(e, ApiException): raise e
+    except ApiException:
+        raise
+    except Exception:
+        await db.rollback()
+        logger.exception("Order cancel failed")
         raise ApiException(
             code="CANCEL_ORDER_FAILED",
             message="Cancel order failed"
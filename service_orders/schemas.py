@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Any
+import msgspec
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
@@ -40,42 +41,24 @@ class OrderUpdate(BaseModel):
 
 
 class OrderResponse(BaseModel):
-    """Схема заказа в ответах на запросы"""
+    """Схема заказа в ответах на запросы. В списке заказов items может быть не запрошен"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: UUID
     user_id: UUID
-    items: List[dict]
+    items: Optional[List[dict]] = None
     status: OrderStatus
     total_amount: Decimal
     created_at: datetime
     updated_at: datetime
-    
-    class Config:
-        from_attributes = True
-
-
-class ErrorDetail(BaseModel):
-    """Схема детали ошибки"""
-    code: str
-    message: str
-
-
-class ApiResponse(BaseModel):
-    """Стандартный ответ нашего API"""
-    success: bool
-    data: Optional[Any] = None
-    error: Optional[ErrorDetail] = None
 
 
-class PaginatedOrders(BaseModel):
-    """Схема ответа списка заказов с пагинацией"""
-    items: List[OrderResponse]
-    total: int
-    page: int
-    page_size: int
-    pages: int
+# Валидация и сериализация списка заказов одним вызовом вместо цикла по моделям
+ORDER_LIST_ADAPTER = TypeAdapter(List[OrderResponse])
 
 
-class TokenData(BaseModel):
-    """Схема payload в JWT"""
+class TokenData(msgspec.Struct, frozen=True):
+    """Схема payload в JWT. Используется только внутри сервиса,
+    поэтому вместо pydantic-модели - легковесная структура msgspec"""
     user_id: Optional[str] = None
     email: Optional[str] = None
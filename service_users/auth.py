@@ -1,31 +1,80 @@
+import asyncio
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+import jwt
+from jwt import PyJWTError
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from config import settings
 from database import get_db
 from models import User
 from schemas import TokenData, UserRole
+from statements import USER_BY_ID_STMT
 
 # Bearer токен
 security = HTTPBearer()
 
+# Новые пароли хэшируются argon2id, старые хэши bcrypt проверяются до перехэширования при входе
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
 
-def hash_password(password: str) -> str:
-    """Хэшируем пароль"""
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+# Недавно успешно проверенные пароли: ключ - sha256 от пароля и его хэша.
+# Повторные логины с теми же данными не пересчитывают хэш
+_verified_passwords = TTLCache(maxsize=10_000, ttl=60)
 
+# Кэш успешно проверенных токенов: sha256(токен) -> (данные токена, время истечения)
+_token_cache = TTLCache(maxsize=10_000, ttl=60)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверяем сходства двух паролей путем сравнения их хэшей"""
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"),
-        hashed_password.encode("utf-8")
-    )
+# Кэш пользователей для get_current_user: id -> отсоединенная от сессии копия.
+# Сбрасывается при обновлении профиля, в остальных воркерах устаревает не дольше ttl
+_user_cache = TTLCache(maxsize=10_000, ttl=30)
+
+
+def _is_bcrypt_hash(hashed_password: str) -> bool:
+    return hashed_password.startswith("$2")
+
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    if _is_bcrypt_hash(hashed_password):
+        return bcrypt.checkpw(
+            plain_password.encode("utf-8"),
+            hashed_password.encode("utf-8")
+        )
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Проверяем, нужно ли перехэшировать пароль (bcrypt или устаревшие параметры argon2)"""
+    return _is_bcrypt_hash(hashed_password) or _password_hasher.check_needs_rehash(hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """Хэшируем пароль. Хэш считается в потоке, чтобы не блокировать event loop"""
+    return await asyncio.to_thread(_password_hasher.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверяем сходства двух паролей путем сравнения их хэшей.
+    Хэш считается в потоке, успешные проверки ненадолго кэшируются"""
+    cache_key = hashlib.sha256(f"{plain_password}\0{hashed_password}".encode("utf-8")).digest()
+    if cache_key in _verified_passwords:
+        return True
+    
+    is_valid = await asyncio.to_thread(_verify_password_sync, plain_password, hashed_password)
+    if is_valid:
+        _verified_passwords[cache_key] = True
+    return is_valid
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -43,6 +92,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_access_token(token: str) -> TokenData:
     """Декодируем и проверяем JWT токен"""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(cache_key)
+    # Не отдаем из кэша токен, срок действия которого уже истек
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         user_id: str = payload.get("sub")
@@ -54,32 +109,52 @@ def decode_access_token(token: str) -> TokenData:
                 detail="Could not validate credentials"
             )
         
-        return TokenData(user_id=user_id, email=email)
-    except JWTError:
+        token_data = TokenData(user_id=user_id, email=email)
+        _token_cache[cache_key] = (token_data, payload.get("exp", 0))
+        return token_data
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
 
+def _detached_copy(user: User) -> User:
+    """Копия пользователя вне сессии, которую можно хранить в кэше и подключать через merge"""
+    user_copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(user_copy)
+    return user_copy
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Получаем текущего авторизованного пользователя"""
     token = credentials.credentials
     token_data = decode_access_token(token)
     
-    user = db.query(User).filter(User.id == token_data.user_id).scalar()
+    cached_user = _user_cache.get(token_data.user_id)
+    if cached_user is not None:
+        # Привязываем копию из кэша к текущей сессии без запроса к БД
+        return await db.merge(cached_user, load=False)
+    
+    user = await db.scalar(USER_BY_ID_STMT, {"user_id": token_data.user_id})
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
+    _user_cache[token_data.user_id] = _detached_copy(user)
     return user
 
 
+def invalidate_cached_user(user_id: str) -> None:
+    """Убираем пользователя из кэша после изменения его данных"""
+    _user_cache.pop(user_id, None)
+
+
 async def require_admin(current_user: User = Depends(get_current_user)) -> User:
     """Проверяем, что текущий пользователь имеет права админа"""
     if UserRole.ADMIN.value not in current_user.roles:
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,6 +9,7 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file="../.env",
         extra="ignore",
+        frozen=True,
     )
     
     # База данных
@@ -16,20 +19,32 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
     
+    # Пул соединений с БД
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    
     # JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Разрешенные источники CORS, в .env задаются JSON-списком: ["https://example.com"].
+    # По умолчанию кросс-доменные запросы из браузера запрещены
+    ALLOWED_ORIGINS: List[str] = []
+    
     # Настройки текущего сервиса
     APP_HOST: str = Field(validation_alias="SERVICE_USERS_HOST", default="0.0.0.0")
     APP_PORT: int = Field(validation_alias="SERVICE_USERS_PORT", default=8002)
+    # Unix-сокет для приема запросов от API Gateway на том же хосте вместо TCP
+    APP_UDS: Optional[str] = Field(validation_alias="SERVICE_USERS_UDS", default=None)
     
     @property
     def DATABASE_URL(self) -> str:  # noqa
         """Собираем и возвращаем URL базы данных"""
         return (
-            f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
@@ -1,4 +1,7 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from sqlalchemy import text
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
@@ -10,9 +13,20 @@ from models import Base
 from routers import auth, users
 from schemas import ApiResponse, ErrorDetail
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Users Service")
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Создаем таблицы при запуске приложения, а не при импорте модуля
+    async with engine.begin() as conn:
+        # Расширение для триграммных индексов поиска пользователей
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    # Закрываем соединения пула при остановке приложения
+    await engine.dispose()
+
+
+app = FastAPI(title="Users Service", lifespan=lifespan)
 
 
 # Обработчик ошибки валидации с Pydantic
@@ -49,10 +63,13 @@ async def api_exception_handler(_, exc: ApiException):
 # Настраиваем CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=settings.ALLOWED_ORIGINS,
+    # С "*" Starlette отражает любой Origin, поэтому куки и авторизацию разрешаем только для явного списка
+    allow_credentials="*" not in settings.ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Браузер кэширует ответ на preflight-запрос сутки
+    max_age=86400,
 )
 
 v1_prefix = "/v1"
@@ -67,5 +84,8 @@ if __name__ == "__main__":
         "main:app",
         host=settings.APP_HOST,
         port=settings.APP_PORT,
+        uds=settings.APP_UDS,
+        loop="uvloop",
+        http="httptools",
         reload=True
     )
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, String, DateTime, ARRAY
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
 import uuid
+from datetime import datetime
 
 Base = declarative_base()
 
+# Текущее время в UTC на стороне PostgreSQL (колонки без часового пояса, как и раньше).
+# create_all не меняет существующие таблицы, поэтому время также передается из Python:
+# в БД, созданных до server_default, у колонок нет DEFAULT
+_utc_now = func.timezone("utc", func.now())
+
 
 class User(Base):
     """Модель БД для Пользователя"""
@@ -13,8 +18,18 @@ class User(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, nullable=False, index=True)
-    password_hash = Column(String, nullable=False)
+    password_hash = Column(String, nullable=False)  # argon2id, у старых записей - bcrypt до следующего входа
     name = Column(String, nullable=False)
-    roles = Column(ARRAY(String), nullable=False, default=list)
-    created_at = Column(DateTime, default=datetime.utcnow(), nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow(), onupdate=datetime.utcnow(), nullable=False)
+    roles = Column(ARRAY(String), nullable=False, default=list)  # ARRAY из диалекта PostgreSQL - для оператора @>
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=_utc_now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=_utc_now, onupdate=_utc_now, nullable=False)
+    
+    __table_args__ = (
+        # Индекс под пагинацию по ключу (created_at, id) в списке пользователей
+        Index("ix_users_created_at_id", created_at.desc(), id.desc()),
+        # Триграммные индексы под поиск ilike '%...%' по имени и почте (нужно расширение pg_trgm)
+        Index("ix_users_name_trgm", name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        # Фильтр по роли roles @> ARRAY[...]
+        Index("ix_users_roles_gin", roles, postgresql_using="gin"),
+    )
@@ -0,0 +1,22 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Tuple
+from uuid import UUID
+
+from errors import ApiException
+
+
+def encode_cursor(sort_value: Any, row_id: UUID) -> str:
+    """Кодируем ключ последней строки страницы (значение сортировки, id) в непрозрачный курсор"""
+    raw = json.dumps({"v": str(sort_value), "id": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, parse_value: Callable[[str], Any]) -> Tuple[Any, UUID]:
+    """Раскодируем курсор обратно в (значение сортировки, id)"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return parse_value(data["v"]), UUID(data["id"])
+    except (binascii.Error, ValueError, TypeError, KeyError, ArithmeticError):
+        raise ApiException("INVALID_CURSOR", "Invalid pagination cursor")
@@ -0,0 +1,18 @@
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+# Обертка успешного ответа в формате ApiResponse, собирается вокруг уже сериализованных данных
+_SUCCESS_PREFIX = b'{"success":true,"data":'
+_SUCCESS_SUFFIX = b',"error":null}'
+
+
+def success_response(adapter: TypeAdapter, data: Any, status_code: int = 200) -> Response:
+    """Успешный ответ API: данные сериализуются в JSON закэшированным адаптером за один проход,
+    без jsonable_encoder и повторной валидации через response_model"""
+    return Response(
+        content=_SUCCESS_PREFIX + adapter.dump_json(data) + _SUCCESS_SUFFIX,
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -2,64 +2,78 @@ import logging
 from datetime import timedelta
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth import hash_password, verify_password, create_access_token
+from auth import (
+    hash_password, verify_password, password_needs_rehash,
+    create_access_token, invalidate_cached_user
+)
 from config import settings
 from database import get_db
 from errors import ApiException
 from models import User
+from responses import success_response
 from schemas import (
     UserRegister, UserLogin, Token, UserResponse,
-    ApiResponse, ErrorDetail
+    ApiResponse, ErrorDetail, USER_RESPONSE_ADAPTER, TOKEN_ADAPTER
 )
+from statements import USER_BY_EMAIL_STMT
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
 
 
-@router.post("/register", status_code=201, response_model=ApiResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+@router.post("/register", status_code=201, response_model=ApiResponse[UserResponse])
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """Регистрация нового пользователя"""
     try:
         # Проверяем существует ли такой пользователь
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        existing_user = await db.scalar(USER_BY_EMAIL_STMT, {"email": str(user_data.email)})
         if existing_user:
             raise ApiException("USER_ALREADY_EXISTS", "User with this email already exists")
         
-        # Создаем нового пользователя
-        new_user = User(
-            email=str(user_data.email),
-            password_hash=hash_password(user_data.password),
-            name=user_data.name,
-            roles=[role.value for role in user_data.roles]
+        # Создаем нового пользователя, сгенерированные поля возвращаются тем же INSERT
+        new_user = await db.scalar(
+            insert(User)
+            .values(
+                email=str(user_data.email),
+                password_hash=await hash_password(user_data.password),
+                name=user_data.name,
+                roles=list(dict.fromkeys(user_data.roles))
+            )
+            .returning(User)
         )
+        await db.commit()
         
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        
-        return ApiResponse(
-            success=True,
-            data=UserResponse.model_validate(new_user).model_dump(mode='json'),
-            error=None
-        )
+        return success_response(USER_RESPONSE_ADAPTER, UserResponse.from_orm_trusted(new_user), status_code=201)
     
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Users service error: {str(e)}")
-        if isinstance(e, ApiException): raise e
+    except ApiException:
+        raise
+    except Exception:
+        await db.rollback()
+        logger.exception("Users service error")
         raise ApiException("REGISTRATION_FAILED", "Error during registration")
 
 
-@router.post("/login", response_model=ApiResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", response_model=ApiResponse[Token])
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Авторизуем пользователя и возвращаем JWT токен"""
     try:
-        user = db.query(User).filter(User.email == credentials.email).first()
-        if not user or not verify_password(credentials.password, user.password_hash):
+        user = await db.scalar(USER_BY_EMAIL_STMT, {"email": credentials.email})
+        if not user or not await verify_password(credentials.password, user.password_hash):
             raise ApiException("INVALID_CREDENTIALS", "Invalid email or password")
         
+        # Переводим старый хэш на текущий алгоритм, пока пароль известен. Дату обновления профиля не трогаем
+        if password_needs_rehash(user.password_hash):
+            await db.execute(
+                update(User)
+                .where(User.id == user.id)
+                .values(password_hash=await hash_password(credentials.password), updated_at=User.updated_at)
+            )
+            await db.commit()
+            invalidate_cached_user(str(user.id))
+        
         # Создаем токен для авторизации
         access_token_expires = timedelta(minutes=settings.JWT_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
@@ -67,13 +81,10 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             expires_delta=access_token_expires
         )
         
-        return ApiResponse(
-            success=True,
-            data=Token(access_token=access_token, token_type="bearer").model_dump(),
-            error=None
-        )
+        return success_response(TOKEN_ADAPTER, Token(access_token=access_token, token_type="bearer"))
     
-    except Exception as e:
-        logger.error(f"Users service error: {str(e)}")
-        if isinstance(e, ApiException): raise e
+    except ApiException:
+        raise
+    except Exception:
+        logger.exception("Users service error")
         raise ApiException("LOGIN_FAILED", "Error during login")
@@ -1,49 +1,53 @@
 import logging
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import select, func, or_, desc, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-import math
+from datetime import datetime
 
 from database import get_db
 from errors import ApiException
 from models import User
 from schemas import (
     UserResponse, UserUpdate, ApiResponse, 
-    ErrorDetail, PaginatedUsers
+    ErrorDetail, PaginatedUsers, USER_RESPONSE_ADAPTER, PAGINATED_ADAPTER
 )
-from auth import get_current_user, require_admin
+from auth import get_current_user, require_admin, invalidate_cached_user
+from pagination import encode_cursor, decode_cursor
+from responses import success_response
+from statements import USER_BY_EMAIL_STMT
 
 router = APIRouter(prefix="/users", tags=["Users"])
 logger = logging.getLogger(__name__)
 
+# Колонки для списка пользователей, без хэша пароля
+_USER_LIST_COLUMNS = (User.id, User.email, User.name, User.roles, User.created_at, User.updated_at)
 
-@router.get("/me", response_model=ApiResponse)
+
+@router.get("/me", response_model=ApiResponse[UserResponse])
 async def get_current_user_profile(current_user: User = Depends(get_current_user)):
     """Получаем профиль текущего пользователя"""
     try:
-        return ApiResponse(
-            success=True,
-            data=UserResponse.model_validate(current_user).model_dump(mode='json'),
-            error=None
-        )
-    except Exception as e:
-        logger.error(f"Users service error: {str(e)}")
+        return success_response(USER_RESPONSE_ADAPTER, UserResponse.from_orm_trusted(current_user))
+    except ApiException:
+        raise
+    except Exception:
+        logger.exception("Users service error")
         raise ApiException("FETCH_PROFILE_FAILED", "Error during fetching profile")
 
 
-@router.put("/me", response_model=ApiResponse)
+@router.put("/me", response_model=ApiResponse[UserResponse])
 async def update_current_user_profile(
     update_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновляем профиль текущего пользователя"""
     try:
         # Проверяем что новая почта не совпадает с текущей и не имеется у других пользователей
         if update_data.email and update_data.email != current_user.email:
-            existing_user = db.query(User).filter(User.email == update_data.email).first()
+            existing_user = await db.scalar(USER_BY_EMAIL_STMT, {"email": update_data.email})
             if existing_user:
                 raise ApiException("EMAIL_ALREADY_EXISTS", "User with this email already exists")
         
@@ -53,37 +57,42 @@ async def update_current_user_profile(
         if update_data.email is not None:
             current_user.email = update_data.email
         
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        invalidate_cached_user(str(current_user.id))
+        await db.refresh(current_user)
         
-        return ApiResponse(
-            success=True,
-            data=UserResponse.model_validate(current_user).model_dump(mode='json'),
-            error=None
-        )
+        return success_response(USER_RESPONSE_ADAPTER, UserResponse.from_orm_trusted(current_user))
     
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Users service error: {str(e)}")
+    except ApiException:
+        raise
+    except Exception:
+        await db.rollback()
+        logger.exception("Users service error")
         raise ApiException("UPDATE_PROFILE_FAILED", "Error during updating profile")
 
 
-@router.get("/", response_model=ApiResponse)
+@router.get("/", response_model=ApiResponse[PaginatedUsers])
 async def get_all_users(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page (next_cursor from the previous response)"),
     search: Optional[str] = Query(None, description="Search by name or email"),
     role: Optional[str] = Query(None, description="Filter by role"),
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получаем всех пользователей с пагинацией (только для админов)"""
+    """Получаем всех пользователей с пагинацией (только для админов).
+    С курсором страница выбирается по ключу (created_at, id) без OFFSET и подсчета total,
+    без курсора total считается оконной функцией в том же запросе"""
+    last_key = decode_cursor(cursor, datetime.fromisoformat) if cursor else None
+
     try:
-        query = db.query(User)
+        # Загружаем только колонки для ответа
+        query = select(*_USER_LIST_COLUMNS)
         
         # Применяем фильтры
         if search:
-            query = query.filter(
+            query = query.where(
                 or_(
                     User.name.ilike(f"%{search}%"),
                     User.email.ilike(f"%{search}%")
@@ -91,31 +100,58 @@ async def get_all_users(
             )
         
         if role:
-            query = query.filter(User.roles.contains([role]))
+            query = query.where(User.roles.contains([role]))
         
-        # Получаем общее кол-во пользователей с текущими фильтрами
-        total = query.count()
+        # Стабильный порядок нужен для пагинации по ключу
+        ordering = (desc(User.created_at), desc(User.id))
+        query = query.order_by(*ordering)
         
-        # Считаем данные для пагинации
-        pages = math.ceil(total / page_size)
-        offset = (page - 1) * page_size
+        if last_key is not None:
+            # Продолжаем с места, где закончилась предыдущая страница
+            query = query.where(tuple_(User.created_at, User.id) < last_key)
+            total = page = None
+            # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+            users = (await db.execute(query.limit(page_size + 1))).all()
+            has_next = len(users) > page_size
+            users = users[:page_size]
+        else:
+            offset = (page - 1) * page_size
 
-        users = query.offset(offset).limit(page_size).all()
+            # OFFSET проходим только по id в индексе, полные строки догружаем для одной страницы.
+            # Общее кол-во пользователей с текущими фильтрами считаем тем же запросом
+            page_ids = (
+                query.with_only_columns(User.id, func.count().over().label("total"))
+                .offset(offset)
+                .limit(page_size)
+                .subquery()
+            )
+            users = (await db.execute(
+                select(*_USER_LIST_COLUMNS, page_ids.c.total)
+                .join(page_ids, User.id == page_ids.c.id)
+                .order_by(*ordering)
+            )).all()
+            if users:
+                total = users[0].total
+            elif offset:
+                # Страница за пределами выборки - количество считаем отдельно
+                total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+            else:
+                total = 0
+
+            has_next = offset + len(users) < total
 
-        paginated_data = PaginatedUsers(
-            items=[UserResponse.model_validate(user) for user in users],
-            total=total,
-            page=page,
-            page_size=page_size,
-            pages=pages
+        next_cursor = None
+        if has_next and users:
+            next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+
+        paginated_data = PaginatedUsers.build(
+            users, total, page, page_size, has_next=has_next, next_cursor=next_cursor
         )
         
-        return ApiResponse(
-            success=True,
-            data=paginated_data.model_dump(mode='json'),
-            error=None
-        )
+        return success_response(PAGINATED_ADAPTER, paginated_data)
     
-    except Exception as e:
-        logger.error(f"Users service error: {str(e)}")
+    except ApiException:
+        raise
+    except Exception:
+        logger.exception("Users service error")
         raise ApiException("FETCH_USERS_FAILED", "Error during getting all users")
@@ -1,8 +1,25 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import List, Optional, Any
-from datetime import datetime
-from uuid import UUID
+import msgspec
+from email_validator import validate_email
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field, StringConstraints, TypeAdapter, computed_field
+from pydantic.dataclasses import dataclass
+from typing import Annotated, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar, Any
 from enum import Enum
+import re
+
+
+T = TypeVar("T")
+
+# Упрощенная проверка формы email, выполняется регулярным выражением pydantic-core
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _normalize_email(value: str) -> str:
+    """Приводим почту к виду, в котором ее сохраняет EmailStr при регистрации (домен в нижнем регистре)"""
+    return validate_email(value, check_deliverability=False).normalized
+
+
+# Почта для входа: мусор отсекается регулярным выражением, затем адрес нормализуется как при регистрации
+LoginEmailStr = Annotated[str, StringConstraints(pattern=EMAIL_RE.pattern), AfterValidator(_normalize_email)]
 
 
 class UserRole(str, Enum):
@@ -11,75 +28,160 @@ class UserRole(str, Enum):
     CLIENT = "client"
 
 
+# Роли по умолчанию: неизменяемый кортеж общий для всех экземпляров, без копирования и фабрики.
+# Хранятся строковые значения ролей, как и после валидации с use_enum_values
+_DEFAULT_ROLES: Tuple[str, ...] = (UserRole.CLIENT.value,)
+
+# Общие настройки моделей, заданы явно: лишние поля отбрасываются,
+# значения по умолчанию не валидируются повторно, произвольные типы и обрезка пробелов выключены
+_STRICT = ConfigDict(
+    extra="ignore",
+    validate_default=False,
+    arbitrary_types_allowed=False,
+    str_strip_whitespace=False,
+)
+
+# Имя пользователя, общий тип для регистрации и обновления профиля
+NameStr = Annotated[str, StringConstraints(min_length=1, max_length=100)]
+
+
 class UserRegister(BaseModel):
     """Схема для регистрации пользователя"""
+    # Роли проверяются по enum, но хранятся строками, без создания членов UserRole
+    model_config = ConfigDict(**_STRICT, use_enum_values=True)
+    
     email: EmailStr
     password: str = Field(..., min_length=8, description="Password must be at least 8 characters")
-    name: str = Field(..., min_length=1, max_length=100)
-    roles: List[UserRole] = Field(default=[UserRole.CLIENT])
-    
-    @field_validator('roles')
-    @classmethod
-    def validate_roles(cls, v):
-        if not v:
-            return [UserRole.CLIENT]
-        return v
+    name: NameStr
+    roles: Tuple[UserRole, ...] = Field(default=_DEFAULT_ROLES, min_length=1, max_length=len(UserRole))
 
 
 class UserLogin(BaseModel):
-    """Схема для авторизации пользователя"""
-    email: EmailStr
+    """Схема для авторизации пользователя.
+    Почта нормализуется так же, как при регистрации: пользователь ищется по точному совпадению"""
+    model_config = _STRICT
+    
+    email: LoginEmailStr
     password: str
 
 
 class UserUpdate(BaseModel):
     """Схема для обновления пользователя"""
-    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    model_config = _STRICT
+    
+    name: Optional[NameStr] = None
     email: Optional[EmailStr] = None
 
 
+# Общие кортежи ролей: пользователи с одинаковым набором ролей ссылаются на один объект.
+# Ключ - отсортированный набор без повторов, поэтому записей не больше, чем подмножеств UserRole
+_ROLE_TUPLE_CACHE: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _shared_roles(roles: Iterable[str]) -> Tuple[str, ...]:
+    roles = tuple(sorted(set(roles)))
+    return _ROLE_TUPLE_CACHE.setdefault(roles, roles)
+
+
 class UserResponse(BaseModel):
-    """Схема пользователя в ответах на запросы"""
-    id: UUID
+    """Схема пользователя в ответах на запросы.
+    id и даты хранятся уже строками: переводим их один раз при сборке, а не при каждой сериализации.
+    Из объектов БД собирается только через from_orm_trusted"""
+    model_config = ConfigDict(**_STRICT, frozen=True)
+    
+    id: str
     email: str
     name: str
-    roles: List[str]
-    created_at: datetime
-    updated_at: datetime
-    
-    class Config:
-        from_attributes = True
-
+    roles: Tuple[str, ...]
+    created_at: str
+    updated_at: str
 
-class Token(BaseModel):
+    @classmethod
+    def from_orm_trusted(cls, obj: Any) -> "UserResponse":
+        """Собираем ответ из строки БД без валидации: данные из БД уже корректны"""
+        return cls.model_construct(
+            id=str(obj.id),
+            email=obj.email,
+            name=obj.name,
+            roles=_shared_roles(obj.roles),
+            created_at=obj.created_at.isoformat(),
+            updated_at=obj.updated_at.isoformat(),
+        )
+
+
+# Мелкие значения без вложенной валидации - неизменяемые dataclass со слотами, без __dict__ у экземпляров
+@dataclass(slots=True, frozen=True)
+class Token:
     """Схема JWT токена"""
     access_token: str
     token_type: str = "bearer"
 
 
-class TokenData(BaseModel):
-    """Схема payload в JWT"""
+class TokenData(msgspec.Struct, frozen=True):
+    """Схема payload в JWT. Используется только внутри сервиса,
+    поэтому вместо pydantic-модели - легковесная структура msgspec"""
     user_id: Optional[str] = None
     email: Optional[str] = None
 
 
-class ErrorDetail(BaseModel):
+@dataclass(slots=True, frozen=True)
+class ErrorDetail:
     """Схема детали ошибки"""
     code: str
     message: str
 
 
-class ApiResponse(BaseModel):
-    """Стандартный ответ нашего API"""
+class ApiResponse(BaseModel, Generic[T]):
+    """Стандартный ответ нашего API.
+    Тип данных задается параметром (ApiResponse[UserResponse]), чтобы сериализатор был типизированным"""
     success: bool
-    data: Optional[Any] = None
+    data: Optional[T] = None
     error: Optional[ErrorDetail] = None
 
 
 class PaginatedUsers(BaseModel):
-    """Схема ответа списка пользователя с пагинацией"""
+    """Схема ответа списка пользователя с пагинацией.
+    При запросе по курсору total, page и pages не считаются"""
+    model_config = _STRICT
+    
     items: List[UserResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    pages: int
+    has_next: bool = False
+    next_cursor: Optional[str] = None
+
+    @computed_field
+    @property
+    def pages(self) -> Optional[int]:
+        """Количество страниц считается из total при сериализации"""
+        if self.total is None:
+            return None
+        return (self.total + self.page_size - 1) // self.page_size
+
+    @classmethod
+    def build(
+        cls,
+        rows: Iterable[Any],
+        total: Optional[int],
+        page: Optional[int],
+        page_size: int,
+        has_next: bool = False,
+        next_cursor: Optional[str] = None,
+    ) -> "PaginatedUsers":
+        """Собираем страницу из строк БД без валидации,
+        вся страница затем сериализуется одним вызовом PAGINATED_ADAPTER"""
+        return cls.model_construct(
+            items=[UserResponse.from_orm_trusted(row) for row in rows],
+            total=total,
+            page=page,
+            page_size=page_size,
+            has_next=has_next,
+            next_cursor=next_cursor,
+        )
+
+
+# Сериализаторы ответов собираются один раз при импорте модуля
+USER_RESPONSE_ADAPTER = TypeAdapter(UserResponse)
+PAGINATED_ADAPTER = TypeAdapter(PaginatedUsers)
+TOKEN_ADAPTER = TypeAdapter(Token)
@@ -0,0 +1,23 @@
+"""Сборка горячих модулей (схемы и авторизация) в нативные модули через Cython.
+
+Запуск: python setup.py build_ext --inplace
+Рядом с исходниками появятся .so, которые Python импортирует вместо .py.
+Без сборки сервис работает на обычных .py файлах"""
+import os
+
+from Cython.Build import cythonize
+from setuptools import Extension, setup
+
+# Имя модуля задаем явно: каталог сервиса содержит __init__.py,
+# и без этого Cython собрал бы его как часть пакета.
+# statements.py не компилируем: lambda_stmt разбирает байткод лямбд
+COMPILED_MODULES = ["schemas", "auth"]
+
+setup(
+    name="service_users",
+    ext_modules=cythonize(
+        [Extension(name, [f"{name}.py"]) for name in COMPILED_MODULES],
+        language_level=3,
+        nthreads=os.cpu_count() or 1,
+    ),
+)
@@ -0,0 +1,8 @@
+from sqlalchemy import select, bindparam, lambda_stmt
+
+from models import User
+
+# Частые запросы пользователя по id и email. SQL компилируется один раз и берется из кэша.
+# Модуль не компилируется Cython: lambda_stmt разбирает байткод лямбд
+USER_BY_ID_STMT = lambda_stmt(lambda: select(User).where(User.id == bindparam("user_id")))
+USER_BY_EMAIL_STMT = lambda_stmt(lambda: select(User).where(User.email == bindparam("email")))
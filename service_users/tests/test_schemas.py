@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from schemas import UserLogin, UserRegister, UserResponse
+
+
+def test_login_email_normalized_like_register():
+    """Почта, введенная при входе так же, как при регистрации, совпадает с сохраненной"""
+    registered = UserRegister(email="Bob@Example.COM", password="password123", name="Bob")
+    login = UserLogin(email="Bob@Example.COM", password="password123")
+    assert registered.email == "Bob@example.com"
+    assert login.email == registered.email
+
+
+@pytest.mark.parametrize("email", ["bob", "bob@example", "bob @example.com"])
+def test_login_rejects_malformed_email(email):
+    with pytest.raises(ValidationError):
+        UserLogin(email=email, password="password123")
+
+
+def test_register_roles_limited_to_role_count():
+    with pytest.raises(ValidationError):
+        UserRegister(email="bob@example.com", password="password123", name="Bob", roles=["client"] * 3)
+
+
+def test_user_response_roles_shared_per_role_set():
+    """Одинаковые наборы ролей в любом порядке и с повторами дают один общий кортеж"""
+    class Row:
+        id = "1"
+        email = "bob@example.com"
+        name = "Bob"
+        created_at = updated_at = datetime(2024, 1, 1)
+
+        def __init__(self, roles):
+            self.roles = roles
+
+    first = UserResponse.from_orm_trusted(Row(["client", "admin"]))
+    second = UserResponse.from_orm_trusted(Row(["admin", "client", "admin"]))
+    assert first.roles == ("admin", "client")
+    assert first.roles is second.roles